@@ -5,28 +5,169 @@
  * This script provides a graphical interface to send PWM and desired Lux values to a microcontroller.
  * It listens for incoming feedback and data from the microcontroller and plots Lux data in real-time.
  *
- * @details The application uses Tkinter for the GUI, Matplotlib for plotting, and pySerial for serial communication.
+ * @details The application uses Tkinter for the GUI, Matplotlib for plotting, pySerial for serial communication
+ *          and orjson for JSON encoding/decoding.
  * Communication involves sending JSON-encoded messages and interpreting JSON responses.
  */
 """
 import tkinter as tk
 import serial
-import json
+from serial.threaded import ReaderThread, Protocol
+import os
+import sys
+import ctypes
+import orjson
 import threading
+import queue
+import re
 import time
+import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
-# Lock to ensure thread-safe access to the serial port.
+# Lock serializing writes to the serial port. Reads happen only on the ReaderThread and must
+# never take it: they do not conflict with writes, and a reader blocking in read() while holding
+# this (unfair) lock would stall send_data and freeze the Tk thread.
 serial_lock = threading.Lock()
+# Queue of (kind, value) GUI updates produced by the USART listener and applied on the Tk thread.
+gui_queue = queue.Queue()
+# Feedback messages are recognised and read straight from the raw bytes, skipping full JSON
+# decoding. Both keys must be top-level (no brace before them) and each value must end at a
+# ',' or '}'; anything else, including escaped message strings, falls back to orjson.
+FEEDBACK_PATTERN = re.compile(
+    rb'\{[^{}]*?"success"\s*:\s*(true|false|-?\d+)(?=\s*[,}])'
+    rb'[^{}]*?"message"\s*:\s*"([^"\\]*)"(?=\s*[,}])'
+)
+JSON_BOOLEANS = {b"true": True, b"false": False}
+# Integer Lux samples are extracted the same way, but only from the exact top-level
+# {"operation": "data", "data": <int>} shape, so a sample nested in (or sharing an object
+# with) another message is never mistaken for one; other shapes fall back to orjson.
+LUX_DATA_PATTERN = re.compile(rb'\{\s*"operation"\s*:\s*"data"\s*,\s*"data"\s*:\s*(-?\d+)\s*\}\Z')
+# (timestamp, Lux) samples handed from the USART listener to the Tk thread.
+sample_q = queue.SimpleQueue()
+# Windows thread access right and priority level used to boost the serial listener thread.
+THREAD_SET_INFORMATION = 0x0020
+THREAD_PRIORITY_ABOVE_NORMAL = 1
+# Round-robin real-time priority used to boost the serial listener thread on Linux.
+LISTENER_RT_PRIORITY = 10
+# Intervals in milliseconds between GUI queue drains and Lux plot redraws.
+GUI_DRAIN_INTERVAL = 100
+PLOT_UPDATE_INTERVAL = 200
+# Interval in milliseconds between attempts to reopen the serial port after it failed.
+SERIAL_RETRY_INTERVAL = 1000
+# Reusable outgoing message; send_data overwrites its fields in place for every send.
+send_payload = {"LED": 0, "PWM": 0, "PRIORITY": 0}
+# Value of the "PRIORITY" field for each option of the priority dropdown.
+PRIORITY_CODES = {"PWM": 1, "LUX": 0}
 # Bounds for the desired Lux values.
 low_lux, high_lux = 0, 1000
-# Lists for storing Lux values and corresponding timestamps.
-lux_values = []
-timestamps = []
-# Flags for managing the Lux data listening process.
+# Ring buffers holding the last LUX_WINDOW timestamps and Lux values, owned by the Tk thread.
+# Every sample is written twice, LUX_WINDOW apart, so the window is always one contiguous slice.
+LUX_WINDOW = 100
+ring_t = np.empty(2 * LUX_WINDOW, dtype=np.float64)
+ring_v = np.empty(2 * LUX_WINDOW, dtype=np.float64)
+ring_idx = 0
+ring_len = 0
+# Flag telling the USART listener whether to forward Lux samples to the plot.
 lux_listening = False
-lux_thread = None
+
+
+"""
+ * @brief Incremental splitter for a stream of concatenated JSON objects.
+ *
+ * Tracks brace depth and string/escape state across calls to feed(), so every byte
+ * is scanned exactly once no matter how the objects are fragmented between reads.
+ * The scan jumps straight to the next brace, quote, backslash or newline, so plain payload
+ * bytes never reach the Python-level loop.
+ *
+"""
+
+
+class IncrementalJsonParser:
+    # Consumed bytes are only discarded once this many have piled up at the buffer head.
+    COMPACT_THRESHOLD = 4096
+    # Messages from the microcontroller are well under 200 bytes; an unfinished object longer
+    # than this can only come from a dropped or corrupted byte.
+    MAX_MESSAGE_SIZE = 1024
+    # Only these bytes can change the parser state; everything else is skipped in C.
+    STRUCTURAL_BYTES = re.compile(rb'[{}"\\\n]')
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.start = 0
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+
+    """
+     * @brief Append raw bytes and return every JSON object completed by them.
+     *
+     * @param data Bytes received from the serial port.
+     * @return List of complete JSON objects as bytes.
+     *
+    """
+
+    def feed(self, data):
+        buffer = self.buffer
+        buffer += data
+        start, pos, depth = self.start, self.pos, self.depth
+        in_string, escape = self.in_string, self.escape
+        messages = []
+        end = len(buffer)
+
+        while pos < end:
+            if escape:
+                escape = False
+                # The escaped byte may be a quote or backslash, so it is skipped. A raw newline
+                # is never a valid escape; it is left to the resync below instead.
+                if buffer[pos] != 0x0A:
+                    pos += 1
+                    continue
+            match = self.STRUCTURAL_BYTES.search(buffer, pos)
+            pos = end if match is None else match.start()
+            # A single lost brace or quote (UART noise, port opened mid-message) would otherwise
+            # leave depth or in_string wrong forever and no further message would be returned.
+            # The partial object is dropped once it is longer than any real message, or at the
+            # end of its line: a raw newline cannot occur inside valid JSON, so each line starts
+            # in a clean state, like the line-by-line decoding this parser replaced.
+            if depth > 0 and (pos - start > self.MAX_MESSAGE_SIZE or (match and buffer[pos] == 0x0A)):
+                depth = 0
+                in_string = False
+                start = pos
+            if match is None:
+                break
+            byte = buffer[pos]
+            if in_string:
+                if byte == 0x5C:  # backslash
+                    escape = True
+                elif byte == 0x22:  # quote
+                    in_string = False
+            elif byte == 0x7B:  # {
+                if depth == 0:
+                    start = pos
+                depth += 1
+            elif depth > 0:
+                if byte == 0x7D:  # }
+                    depth -= 1
+                    if depth == 0:
+                        messages.append(bytes(buffer[start:pos + 1]))
+                        start = pos + 1
+                elif byte == 0x22:
+                    in_string = True
+            pos += 1
+
+        # Bytes outside of any object (e.g. line separators) are never part of a message.
+        if depth == 0:
+            start = pos
+        if start > self.COMPACT_THRESHOLD:
+            del buffer[:start]
+            pos -= start
+            start = 0
+
+        self.start, self.pos, self.depth = start, pos, depth
+        self.in_string, self.escape = in_string, escape
+        return messages
 
 
 """
@@ -39,9 +180,13 @@ lux_thread = None
 
 def send_data(ser):
     try:
-        pwm_value = int(pwm_entry.get())
-        lux_value = int(lux_entry.get())
-        priority = 1 if priority_var.get() == "PWM" else 0
+        pwm_text = pwm_get().strip()
+        lux_text = lux_get().strip()
+        if not (pwm_text.isdigit() and lux_text.isdigit()):
+            status_label.config(text="Please enter valid integers!", fg="red")
+            return
+        pwm_value = int(pwm_text)
+        lux_value = int(lux_text)
 
         if not (low_lux <= lux_value <= high_lux):
             status_label.config(text=f"Lux value is out of possible range({low_lux};{high_lux})!", fg="red")
@@ -49,16 +194,13 @@ def send_data(ser):
         elif not (0 <= pwm_value <= 999):
             status_label.config(text=f"PWM value is out of possible range(0;999)!", fg="red")
         else:
-            data = {
-                "LED": lux_value,
-                "PWM": pwm_value,
-                "PRIORITY": priority
-            }
-            json_data = json.dumps(data)
+            send_payload["LED"] = lux_value
+            send_payload["PWM"] = pwm_value
+            send_payload["PRIORITY"] = PRIORITY_CODES[priority_get()]
+            json_data = orjson.dumps(send_payload)
             with serial_lock:
-                ser.write(json_data.encode('utf-8'))
+                ser.write(json_data)
             status_label.config(text="Data sent successfully!", fg="green")
-            ser.flush()
 
     except ValueError:
         status_label.config(text="Please enter valid integers!", fg="red")
@@ -67,86 +209,162 @@ def send_data(ser):
 
 
 """
- * @brief Listen to USART communication for feedback and configuration updates.
+ * @brief Raise the scheduling priority of a serial listener thread.
  *
- * @param ser Serial connection object.
+ * Uses SetThreadPriority on Windows and SCHED_RR on Linux. Failures (typically missing
+ * privileges for real-time scheduling) are reported and the thread keeps its priority.
+ *
+ * @param thread Started threading.Thread object.
  *
 """
 
 
-def listen_to_usart(ser):
+def raise_thread_priority(thread):
+    try:
+        if sys.platform == "win32":
+            from ctypes import wintypes
+
+            # Declared signatures keep the 64-bit HANDLE from being truncated to a C int, and
+            # use_last_error captures GetLastError() right after each call.
+            kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+            kernel32.OpenThread.restype = wintypes.HANDLE
+            kernel32.OpenThread.argtypes = (wintypes.DWORD, wintypes.BOOL, wintypes.DWORD)
+            kernel32.SetThreadPriority.restype = wintypes.BOOL
+            kernel32.SetThreadPriority.argtypes = (wintypes.HANDLE, ctypes.c_int)
+            kernel32.CloseHandle.restype = wintypes.BOOL
+            kernel32.CloseHandle.argtypes = (wintypes.HANDLE,)
+
+            handle = kernel32.OpenThread(THREAD_SET_INFORMATION, False, thread.native_id)
+            if not handle:
+                raise ctypes.WinError(ctypes.get_last_error())
+            try:
+                if not kernel32.SetThreadPriority(handle, THREAD_PRIORITY_ABOVE_NORMAL):
+                    raise ctypes.WinError(ctypes.get_last_error())
+            finally:
+                kernel32.CloseHandle(handle)
+        elif hasattr(os, "sched_setscheduler"):
+            os.sched_setscheduler(thread.native_id, os.SCHED_RR, os.sched_param(LISTENER_RT_PRIORITY))
+    except OSError as e:
+        print(f"Could not raise priority of {thread.name}: {e}")
+
+
+"""
+ * @brief Dispatch one complete JSON message received from the microcontroller.
+ *
+ * Lux samples and feedback are recognised straight from the raw bytes; any other shape
+ * is decoded with orjson and dispatched by its operation and keys.
+ *
+ * @param json_data Complete JSON object as bytes.
+ *
+"""
+
+
+def handle_message(json_data):
     global low_lux
     global high_lux
-    buffer = ""
-    while True:
-        try:
-            if ser.in_waiting > 0:
-                with serial_lock:
-                    incoming_data = ser.readline().decode('utf-8').strip()
-                    buffer += incoming_data
-
-                while True:
-                    if buffer:
-                        end_pos = buffer.find('}')
-                        if end_pos != -1:
-                            json_data = buffer[:end_pos + 1]
-                            data = json.loads(json_data)
-
-                            if 'success' in data and 'message' in data:
-                                success = data.get("success", "No success value")
-                                message = data.get("message", "No message")
-                                feedback_label.config(text=f"Feedback - Success: {success}, Message: {message}")
-                            elif 'operation' in data and 'message' in data and 'low_lux' in data and 'high_lux' in data:
-                                # success = data.get("success", "No success value")
-                                # message = data.get("message", "No message")
-                                low_lux = data.get("low_lux", "No low_lux value")
-                                high_lux = data.get("high_lux", "No high_lux value")
-                            buffer = buffer[end_pos + 1:]
-                        else:
-                            break
-                    else:
-                        break
-
-            time.sleep(0.1)
-
-        except Exception as e:
-            print(f"Error while listening to USART: {e}")
-            time.sleep(0.1)
+    sample = LUX_DATA_PATTERN.match(json_data)
+    if sample:
+        if lux_listening:
+            sample_q.put_nowait((time.time(), int(sample[1])))
+        return
+
+    # Feedback that also carries an operation is left to the full decode below, which
+    # handles a Lux sample and feedback in the same message.
+    feedback = FEEDBACK_PATTERN.match(json_data)
+    if feedback and b'"operation"' not in json_data:
+        success = JSON_BOOLEANS.get(feedback[1])
+        if success is None:
+            success = int(feedback[1])
+        message = feedback[2].decode('utf-8')
+        gui_queue.put(("feedback", f"Feedback - Success: {success}, Message: {message}"))
+        return
+
+    data = orjson.loads(json_data)
+
+    if data.get("operation") == "data" and "data" in data:
+        lux_value = data["data"]
+        # Only numbers fit the float64 plot buffers; bool is excluded although it subclasses int.
+        if not isinstance(lux_value, (int, float)) or isinstance(lux_value, bool):
+            print(f"Ignoring non-numeric Lux value: {lux_value!r}")
+        elif lux_listening:
+            sample_q.put_nowait((time.time(), lux_value))
+
+    if 'success' in data and 'message' in data:
+        success = data.get("success", "No success value")
+        message = data.get("message", "No message")
+        gui_queue.put(("feedback", f"Feedback - Success: {success}, Message: {message}"))
+    elif 'operation' in data and 'message' in data and 'low_lux' in data and 'high_lux' in data:
+        # success = data.get("success", "No success value")
+        # message = data.get("message", "No message")
+        low_lux = data.get("low_lux", "No low_lux value")
+        high_lux = data.get("high_lux", "No high_lux value")
 
 
 """
- * @brief Continuously listen for real-time Lux data and update the GUI.
+ * @brief pySerial protocol receiving feedback, configuration updates and Lux data.
  *
- * @param ser Serial connection object.
+ * Runs on a serial.threaded.ReaderThread, which reads all pending bytes per call and
+ * passes them to data_received(); every complete message is handed to handle_message().
+ *
+"""
+
+
+class UsartProtocol(Protocol):
+    def connection_made(self, transport):
+        self.parser = IncrementalJsonParser()
+
+    def data_received(self, data):
+        for json_data in self.parser.feed(data):
+            try:
+                handle_message(json_data)
+            except orjson.JSONDecodeError:
+                print(f"Invalid JSON received: {json_data!r}")
+            except Exception as e:
+                # Anything escaping data_received would stop the ReaderThread.
+                print(f"Error while handling USART message: {e}")
+
+    def connection_lost(self, exc):
+        if exc is not None:
+            print(f"Error while listening to USART: {exc}")
+            # The ReaderThread has exited; the Tk thread reports it and reopens the port.
+            gui_queue.put(("serial_error", f"Serial connection lost: {exc}"))
+
+
+"""
+ * @brief Start a ReaderThread delivering serial data to UsartProtocol.
+ *
+"""
+
+
+def start_serial_reader():
+    global listen_thread
+    listen_thread = ReaderThread(serial_conn, UsartProtocol)
+    listen_thread.start()
+    raise_thread_priority(listen_thread)
+
+
+"""
+ * @brief Reopen the serial port and restart the reader after a connection failure.
+ *
+ * Sending stays disabled until the port is open again; failed attempts are retried
+ * every SERIAL_RETRY_INTERVAL milliseconds on the Tk event loop.
  *
 """
 
 
-def listen_for_lux(ser):
-    global lux_listening
-    while lux_listening:
-        try:
-            if ser.in_waiting > 0:
-                with serial_lock:
-                    incoming_data = ser.readline().decode('utf-8').strip()
-                if incoming_data:
-                    try:
-                        data = json.loads(incoming_data)
-                        if data.get("operation") == "data" and "data" in data:
-                            lux_value = data["data"]
-                            lux_value_label.config(text=f"Current Lux: {lux_value}")
-                            timestamps.append(time.time())
-                            lux_values.append(lux_value)
-                            if len(timestamps) > 100:
-                                timestamps.pop(0)
-                                lux_values.pop(0)
-                    except json.JSONDecodeError:
-                        print(f"Invalid JSON received: {incoming_data}")
-
-            time.sleep(0.1)
-        except Exception as e:
-            print(f"Error while listening for lux data: {e}")
-            time.sleep(0.1)
+def restart_serial_reader():
+    try:
+        if serial_conn.is_open:
+            serial_conn.close()
+        serial_conn.open()
+    except serial.SerialException as e:
+        status_label.config(text=f"Serial connection lost: {e}. Retrying...", fg="red")
+        root.after(SERIAL_RETRY_INTERVAL, restart_serial_reader)
+        return
+
+    start_serial_reader()
+    send_button.config(state=tk.NORMAL)
+    status_label.config(text="Serial connection re-established.", fg="green")
 
 
 """
@@ -156,51 +374,85 @@ def listen_for_lux(ser):
 
 
 def start_stop_lux_listening():
-    global lux_listening, lux_thread, timestamps, lux_values
+    global lux_listening, ring_idx, ring_len
 
     if lux_listening:
         lux_listening = False
         lux_status_label.config(text="Stopped listening for Lux data.")
     else:
-        timestamps.clear()
-        lux_values.clear()
-        ax.clear()
-        canvas.draw()
+        # Discard samples left over from the previous listening session.
+        while True:
+            try:
+                sample_q.get_nowait()
+            except queue.Empty:
+                break
+        ring_idx = ring_len = 0
+        lux_line.set_data([], [])
+        canvas.draw_idle()
 
         lux_listening = True
-        lux_thread = threading.Thread(target=listen_for_lux, args=(serial_conn,), daemon=True)
-        lux_thread.start()
         lux_status_label.config(text="Listening for Lux data...")
 
 
 """
- * @brief Update the Lux plot in real-time.
+ * @brief Apply pending GUI updates from the USART listener on the Tk main thread.
+ *
+ * Tk widgets are not thread-safe, so the listener only enqueues updates and this
+ * callback, rescheduled with root.after(), performs the actual widget changes.
  *
 """
 
 
-def update_plot():
-    while True:
-        if len(timestamps) > 0:
-            ax.clear()
-            ax.plot(timestamps, lux_values, label="Lux", color="blue")
-            ax.set_title("Lux Values Over Time")
-            ax.set_xlabel("Time (s)")
-            ax.set_ylabel("Lux")
-            ax.legend()
-            canvas.draw()
-        time.sleep(1)
+def drain_gui_queue():
+    global ring_idx, ring_len
+    try:
+        while True:
+            try:
+                kind, value = gui_queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "feedback":
+                feedback_label.config(text=value)
+            elif kind == "serial_error":
+                status_label.config(text=f"{value}. Reconnecting...", fg="red")
+                send_button.config(state=tk.DISABLED)
+                root.after(SERIAL_RETRY_INTERVAL, restart_serial_reader)
+
+        lux_value = None
+        while True:
+            try:
+                timestamp, lux_value = sample_q.get_nowait()
+            except queue.Empty:
+                break
+            ring_t[ring_idx] = ring_t[ring_idx + LUX_WINDOW] = timestamp
+            ring_v[ring_idx] = ring_v[ring_idx + LUX_WINDOW] = lux_value
+            ring_idx = (ring_idx + 1) % LUX_WINDOW
+            ring_len = min(ring_len + 1, LUX_WINDOW)
+        # Only the newest Lux sample is displayed, however many arrived since the last drain.
+        if lux_value is not None:
+            lux_value_label.config(text=f"Current Lux: {lux_value}")
+    finally:
+        # Reschedule even if an update failed, so one bad item cannot stop all later ones.
+        root.after(GUI_DRAIN_INTERVAL, drain_gui_queue)
 
 
 """
- * @brief Start the thread responsible for updating the Lux plot.
+ * @brief Update the Lux plot in real-time.
+ *
+ * Runs on the Tk main thread and reschedules itself with root.after().
  *
 """
 
 
-def start_plot_thread():
-    plot_thread = threading.Thread(target=update_plot, daemon=True)
-    plot_thread.start()
+def update_plot():
+    if ring_len > 0:
+        # Once the ring is full the oldest sample sits at ring_idx; before that it is at 0.
+        start = ring_idx if ring_len == LUX_WINDOW else 0
+        lux_line.set_data(ring_t[start:start + ring_len], ring_v[start:start + ring_len])
+        ax.relim()
+        ax.autoscale_view()
+        canvas.draw_idle()
+    root.after(PLOT_UPDATE_INTERVAL, update_plot)
 
 
 # Main script entry point. Initialize GUI and serial communication.
@@ -232,6 +484,11 @@ priority_dropdown = tk.OptionMenu(root, priority_var, "PWM", "LUX")
 priority_dropdown.config(font=("Arial", 14))
 priority_dropdown.pack(pady=10)
 
+# Cache the input getters used by send_data.
+pwm_get = pwm_entry.get
+lux_get = lux_entry.get
+priority_get = priority_var.get
+
 # Create and configure the "Send Data" button.
 send_button = tk.Button(
     root, text="Send Data", font=("Arial", 14),
@@ -264,11 +521,30 @@ canvas = FigureCanvasTkAgg(fig, master=root)
 canvas_widget = canvas.get_tk_widget()
 canvas_widget.pack(fill=tk.BOTH, expand=True)
 
-# Start the thread responsible for updating the Lux plot in real-time.
-start_plot_thread()
+# Create the Lux line and axes decorations once; update_plot only swaps the line data.
+lux_line, = ax.plot([], [], label="Lux", color="blue")
+ax.set_title("Lux Values Over Time")
+ax.set_xlabel("Time (s)")
+ax.set_ylabel("Lux")
+ax.legend()
+
+# Start applying GUI updates published by the USART listener.
+root.after(GUI_DRAIN_INTERVAL, drain_gui_queue)
+
+# Schedule the periodic Lux plot refresh on the Tk event loop.
+root.after(PLOT_UPDATE_INTERVAL, update_plot)
 
 # Initialize the serial connection.
-serial_conn = serial.Serial('COM5', 9600, timeout=1)
+# No read timeout: the ReaderThread blocks until bytes arrive instead of waking up idle,
+# and is stopped through cancel_read() rather than by polling.
+serial_conn = serial.Serial('COM5', 9600, timeout=None)
+
+# Drop the USB-serial latency timer; pySerial only implements this on Linux.
+if sys.platform.startswith("linux"):
+    try:
+        serial_conn.set_low_latency_mode(True)
+    except (IOError, ValueError) as e:
+        print(f"Could not enable low latency mode: {e}")
 
 # Check if the serial connection is open.
 if serial_conn.is_open:
@@ -277,10 +553,7 @@ else:
     print("Error: Serial connection not open.")
 
 # Start a separate thread to listen for USART feedback.
-listen_thread = threading.Thread(
-    target=listen_to_usart, args=(serial_conn,), daemon=True
-)
-listen_thread.start()
+start_serial_reader()
 
 # Run the main GUI event loop.
 root.mainloop()